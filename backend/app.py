@@ -13,20 +13,36 @@ Project: Phishing Website and URL Detection Using Machine Learning
 """
 
 import os
+import re
+import sys
+import queue
+import atexit
 import joblib
+import hashlib
+import functools
+import threading
+import logging
+import logging.handlers
 import ipaddress
 import traceback
+import numpy as np
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
+# ONNX Runtime is optional: without it the sklearn model serves predictions
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
 # Import ML feature extractor (returns LIST)
 # Explicit import from current directory to avoid root directory conflicts
-import sys
-import os
 _backend_dir = os.path.dirname(os.path.abspath(__file__))
 if _backend_dir not in sys.path:
     sys.path.insert(0, _backend_dir)
-from ml_feature_extractor import extract_features, get_feature_count
+from ml_feature_extractor import extract_features_array, N_FEATURES
 
 # Import rule-based feature extractor (returns DICT)
 from features.feature_extractor import FeatureExtractor
@@ -35,12 +51,12 @@ from features.feature_extractor import FeatureExtractor
 from rules.rule_engine import RuleEngine
 
 # Import URL validation (loose validation) and domain extraction
-from utils.helpers import validate_url, extract_domain
+from utils.helpers import validate_url, parse_url, extract_domain
 
 # ------------------ TRUSTED DOMAIN ALLOWLIST ------------------
 # Used to reduce false positives from URL-only ML models.
 # This runs AFTER ML prediction and does NOT modify ML confidence.
-TRUSTED_DOMAINS = {
+TRUSTED_DOMAINS = frozenset({
     "wikipedia.org",
     "google.com",
     "github.com",
@@ -48,7 +64,19 @@ TRUSTED_DOMAINS = {
     "apple.com",
     "amazon.com",
     "openai.com",
-}
+})
+
+# Subdomain suffixes of the trusted domains, e.g. ".wikipedia.org", so that
+# the subdomain check is a single str.endswith() call
+TRUSTED_DOMAIN_SUFFIXES = tuple(f".{trusted}" for trusted in TRUSTED_DOMAINS)
+
+# ------------------ FALLBACK SAFE DOMAINS ------------------
+# Exact hostnames reported as SAFE when ML is unavailable (rule fallback only).
+FALLBACK_SAFE_DOMAINS = frozenset({
+    "google.com",
+    "www.google.com",
+    "accounts.google.com",
+})
 
 # ------------------ CONFIDENCE GATING THRESHOLD ------------------
 # Hard threshold to prevent over-claiming phishing detection.
@@ -65,11 +93,125 @@ VERIFICATION_SOURCES = [
     "https://transparencyreport.google.com",
 ]
 
+# ------------------ ANALYSIS CACHE ------------------
+# Maximum number of distinct URLs whose analysis result is kept in memory.
+# Repeat submissions of a cached URL skip feature extraction, ML and rules.
+# Rule-based fallbacks for failed ML predictions are never cached.
+# Each worker process has its own cache. The model and rules are loaded at
+# import, so replacing them needs a restart, which also empties the cache.
+ANALYSIS_CACHE_SIZE = 10000
+
+# ------------------ DECISIVE SAFE FAST PATH ------------------
+# When the ML model is this confident a URL is safe, the rule engine is
+# skipped and the explanation fields come from the static template below.
+DECISIVE_SAFE_CONFIDENCE = 0.2
+
+DECISIVE_SAFE_RULE_RESULT = {
+    "evidence": [
+        {
+            "label": "Machine Learning Analysis",
+            "status": "safe",
+            "icon": "check"
+        }
+    ],
+    "checkedItems": [
+        "Machine learning analysis found no significant phishing indicators"
+    ],
+    "identificationTips": [
+        "Check for misspelled or altered brand names",
+        "Avoid links that demand urgent action",
+        "Be cautious with unfamiliar domain extensions",
+        "Verify the website before entering sensitive information"
+    ],
+    "actionSteps": [
+        "You may proceed, but remain alert",
+        "Verify authenticity if sensitive data is requested"
+    ]
+}
+
+# ------------------ ML VERDICT THRESHOLDS ------------------
+# Lower bounds of the SUSPICIOUS and PHISHING bands, and the verdict for each band.
+# np.searchsorted(..., side="right") maps a confidence to its band index so that
+# a value exactly on a threshold falls into the higher band (>= semantics).
+ML_VERDICT_THRESHOLDS = np.array([0.4, 0.7])
+ML_VERDICT_TABLE = np.array(["SAFE", "SUSPICIOUS", "PHISHING"])
+
+# ------------------ BATCH ANALYSIS LIMIT ------------------
+# Maximum number of URLs accepted by /api/analyze_batch in one request.
+MAX_BATCH_URLS = 1000
+
+
+class FeatureExtractionError(Exception):
+    """Raised when ML feature extraction fails for a URL."""
+
+
+class PredictionFailedError(Exception):
+    """Raised when the ML model fails (or is unavailable) for a URL."""
+
+
 # ==================== FLASK APP SETUP ====================
 
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Used by jsonify() and request.get_json(); orjson encodes the
+    evidence/checkedItems-heavy responses several times faster than
+    the standard library json module.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+            mimetype="application/json"
+        )
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for frontend communication
 
+# ------------------ REQUEST LOGGING ------------------
+# Request-path log lines are queued and written to stdout by a background
+# thread, so request threads never block on stdout I/O.
+# Request-time tracebacks are logged at DEBUG level, so the stack is only
+# walked and formatted when FLASK_DEBUG=1 (dev server or gunicorn).
+logger = logging.getLogger("atomguard")
+logger.setLevel(logging.DEBUG if os.environ.get("FLASK_DEBUG", "0") == "1" else logging.INFO)
+logger.propagate = False
+
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = None
+
+
+def _start_log_listener():
+    """Start the background thread that writes queued log records to stdout."""
+    global _log_listener
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, handler)
+    _log_listener.start()
+
+
+def _stop_log_listener():
+    """Flush queued log records at interpreter exit."""
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+_start_log_listener()
+atexit.register(_stop_log_listener)
+# Threads do not survive fork (gunicorn preload_app), so each worker starts its own
+os.register_at_fork(after_in_child=_start_log_listener)
+
 # Initialize rule-based components
 feature_extractor = FeatureExtractor()  # For rule engine and UI
 rule_engine = RuleEngine()  # For explanations only
@@ -85,104 +227,1003 @@ MODEL_PATH = os.path.join(
 # Get absolute path for logging
 MODEL_PATH_ABS = os.path.abspath(MODEL_PATH)
 
-ml_model = None
-ml_available = False  # Global flag to track ML availability
+def _stat_or_none(path):
+    """Stat a file once, returning None if it does not exist."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
 
-try:
-    # Explicitly check that model file exists
-    if not os.path.exists(MODEL_PATH_ABS):
-        print(f"❌ ERROR: ML model file not found at: {MODEL_PATH_ABS}")
-        print("⚠️  Backend will use rule-based fallback only")
-        ml_model = None
-        ml_available = False
-    elif os.path.getsize(MODEL_PATH_ABS) == 0:
-        print(f"❌ ERROR: ML model file is empty (0 bytes) at: {MODEL_PATH_ABS}")
-        print("⚠️  Backend will use rule-based fallback only")
-        ml_model = None
-        ml_available = False
-    else:
-        # File exists and has content, attempt to load
-        print(f"📂 Model path: {MODEL_PATH_ABS}")
-        print(f"📊 Model file size: {os.path.getsize(MODEL_PATH_ABS)} bytes")
+
+def _load_sklearn_model():
+    """
+    Load and validate the pickled sklearn model.
+
+    Returns:
+        Tuple of (model, available). model is None when loading or
+        validation fails.
+    """
+    ml_model = None
+    ml_available = False
+
+    try:
+        # Explicitly check that model file exists (one stat for existence and size)
+        model_stat = _stat_or_none(MODEL_PATH_ABS)
+        if model_stat is None:
+            print(f"❌ ERROR: ML model file not found at: {MODEL_PATH_ABS}")
+            print("⚠️  Backend will use rule-based fallback only")
+            ml_model = None
+            ml_available = False
+        elif model_stat.st_size == 0:
+            print(f"❌ ERROR: ML model file is empty (0 bytes) at: {MODEL_PATH_ABS}")
+            print("⚠️  Backend will use rule-based fallback only")
+            ml_model = None
+            ml_available = False
+        else:
+            # File exists and has content, attempt to load
+            print(f"📂 Model path: {MODEL_PATH_ABS}")
+            print(f"📊 Model file size: {model_stat.st_size} bytes")
         
-        try:
-            # Load model using joblib
-            ml_model = joblib.load(MODEL_PATH_ABS)
-            print("✅ Model file loaded successfully")
+            try:
+                # Load model using joblib
+                ml_model = joblib.load(MODEL_PATH_ABS)
+                print("✅ Model file loaded successfully")
             
-            # Verify model has predict_proba() method
-            if not hasattr(ml_model, 'predict_proba'):
-                if hasattr(ml_model, 'predict'):
-                    print("⚠️  WARNING: Model only supports predict(), not predict_proba()")
+                # Verify model has predict_proba() method
+                if not hasattr(ml_model, 'predict_proba'):
+                    if hasattr(ml_model, 'predict'):
+                        print("⚠️  WARNING: Model only supports predict(), not predict_proba()")
+                    else:
+                        raise ValueError("Loaded model does not support predict_proba() or predict()")
                 else:
-                    raise ValueError("Loaded model does not support predict_proba() or predict()")
-            else:
-                print("✅ Model has predict_proba() method")
+                    print("✅ Model has predict_proba() method")
             
-            # Validate feature compatibility
-            extractor_feature_count = get_feature_count()
-            print(f"📊 Feature extractor provides {extractor_feature_count} features")
+                # Validate feature compatibility
+                extractor_feature_count = N_FEATURES
+                print(f"📊 Feature extractor provides {extractor_feature_count} features")
             
-            # Check model's expected feature count if available
-            if hasattr(ml_model, 'n_features_in_'):
-                model_expected_features = ml_model.n_features_in_
-                print(f"📊 Model expects {model_expected_features} features (n_features_in_)")
+                # Check model's expected feature count if available
+                if hasattr(ml_model, 'n_features_in_'):
+                    model_expected_features = ml_model.n_features_in_
+                    print(f"📊 Model expects {model_expected_features} features (n_features_in_)")
                 
-                if model_expected_features != extractor_feature_count:
-                    error_msg = (
-                        f"❌ ERROR: Feature count mismatch! "
-                        f"Model expects {model_expected_features} features but extractor provides {extractor_feature_count}"
-                    )
-                    print(error_msg)
-                    raise ValueError(error_msg)
+                    if model_expected_features != extractor_feature_count:
+                        error_msg = (
+                            f"❌ ERROR: Feature count mismatch! "
+                            f"Model expects {model_expected_features} features but extractor provides {extractor_feature_count}"
+                        )
+                        print(error_msg)
+                        raise ValueError(error_msg)
+                    else:
+                        print("✅ Feature count validation passed")
                 else:
-                    print("✅ Feature count validation passed")
-            else:
-                # Model doesn't have n_features_in_, test with dummy features
-                print("⚠️  Model does not have n_features_in_ attribute, testing with dummy features...")
-                test_features = [0.0] * extractor_feature_count
-                try:
-                    if hasattr(ml_model, 'predict_proba'):
-                        _ = ml_model.predict_proba([test_features])
-                    elif hasattr(ml_model, 'predict'):
-                        _ = ml_model.predict([test_features])
-                    print(f"✅ Model compatibility verified ({extractor_feature_count} features)")
-                except ValueError as ve:
-                    error_msg = str(ve)
-                    if "features" in error_msg.lower() and "expecting" in error_msg.lower():
-                        # Extract expected feature count from error
-                        import re
-                        match = re.search(r'expecting (\d+) features', error_msg)
-                        if match:
-                            expected = match.group(1)
-                            error_msg = (
-                                f"❌ ERROR: Model expects {expected} features but extractor provides {extractor_feature_count}"
-                            )
-                            print(error_msg)
-                            raise ValueError(error_msg)
-                    raise
+                    # Model doesn't have n_features_in_, test with dummy features
+                    print("⚠️  Model does not have n_features_in_ attribute, testing with dummy features...")
+                    test_features = [0.0] * extractor_feature_count
+                    try:
+                        if hasattr(ml_model, 'predict_proba'):
+                            _ = ml_model.predict_proba([test_features])
+                        elif hasattr(ml_model, 'predict'):
+                            _ = ml_model.predict([test_features])
+                        print(f"✅ Model compatibility verified ({extractor_feature_count} features)")
+                    except ValueError as ve:
+                        error_msg = str(ve)
+                        if "features" in error_msg.lower() and "expecting" in error_msg.lower():
+                            # Extract expected feature count from error
+                            match = re.search(r'expecting (\d+) features', error_msg)
+                            if match:
+                                expected = match.group(1)
+                                error_msg = (
+                                    f"❌ ERROR: Model expects {expected} features but extractor provides {extractor_feature_count}"
+                                )
+                                print(error_msg)
+                                raise ValueError(error_msg)
+                        raise
             
-            # All validations passed
-            ml_available = True
-            print("✅ ML Model: ✅ Available and ready")
+                # All validations passed
+                ml_available = True
+                print("✅ ML Model: ✅ Available and ready")
             
-        except Exception as load_error:
-            # Error during model loading
-            print(f"❌ ERROR: Failed to load ML model")
-            print(f"   Error: {str(load_error)}")
-            print(f"   Traceback:\n{traceback.format_exc()}")
-            print("⚠️  Backend will use rule-based fallback only")
-            ml_model = None
-            ml_available = False
+            except Exception as load_error:
+                # Error during model loading
+                print(f"❌ ERROR: Failed to load ML model")
+                print(f"   Error: {str(load_error)}")
+                print(f"   Traceback:\n{traceback.format_exc()}")
+                print("⚠️  Backend will use rule-based fallback only")
+                ml_model = None
+                ml_available = False
             
-except Exception as e:
-    # Unexpected error during setup
-    print(f"❌ ERROR: Unexpected error during ML model setup")
-    print(f"   Error: {str(e)}")
-    print(f"   Traceback:\n{traceback.format_exc()}")
-    print("⚠️  Backend will use rule-based fallback only")
-    ml_model = None
-    ml_available = False
+    except Exception as e:
+        # Unexpected error during setup
+        print(f"❌ ERROR: Unexpected error during ML model setup")
+        print(f"   Error: {str(e)}")
+        print(f"   Traceback:\n{traceback.format_exc()}")
+        print("⚠️  Backend will use rule-based fallback only")
+        ml_model = None
+        ml_available = False
+
+    return ml_model, ml_available
+
+
+# ==================== ONNX RUNTIME SESSION ====================
+# The sklearn model is converted to ONNX once and served through ONNX Runtime,
+# which evaluates the model in native code instead of through sklearn's
+# per-call Python wrappers. The ONNX file is plain protobuf, so loading it
+# does not execute pickled code. The sklearn model remains the fallback
+# if the ONNX model is missing, stale, or cannot be served.
+
+ONNX_MODEL_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "model",
+    "phishing_model.onnx"
+)
+
+# Graph optimized by ONNX Runtime, written on the first start and reused
+# on later starts so workers skip graph optimization
+ONNX_OPT_MODEL_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "model",
+    "phishing_model.opt.onnx"
+)
+
+# ONNX metadata key recording the SHA-256 of the pickle it was converted from
+ONNX_SOURCE_HASH_KEY = "source_sha256"
+
+# ONNX metadata key marking a model that passed _check_onnx_parity(). Files
+# without it are reconverted (and checked) before they are served.
+ONNX_PARITY_KEY = "sklearn_parity"
+ONNX_PARITY_VERIFIED = "verified"
+
+# ONNX Runtime sums tree votes in float32, so a probability sklearn reports
+# as exactly 0.85 comes back as 0.84999949 and would land in the band below.
+# Every threshold the API applies, and every cut-off of the f"{p:.1%}" shown
+# in explanations, lies on a 1e-4 grid, so values within float32 error of a
+# grid point are snapped onto it; others keep ONNX Runtime's value. Plain
+# rounding either leaves some threshold values in the wrong band (6 decimals)
+# or changes the confidence field, round(p * 100, 2) (5 decimals).
+ONNX_SNAP_DECIMALS = 4
+ONNX_SNAP_TOLERANCE = 1e-6
+
+# Feature values a converted model must score like predict_proba() before it
+# is served, one axis per ML feature in extract_features() order. All
+# combinations are checked (about 1.8M rows); with the bundled model
+# thousands of them sit exactly on a confidence threshold.
+ONNX_PARITY_GRID = (
+    range(256),   # url_length
+    range(32),    # hostname_length
+    (0, 1, 16),   # path_length
+    (0, 1),       # has_https
+    (0, 1),       # suspicious_tld
+    (0, 1),       # is_ip_address
+    range(9),     # dot_count
+)
+
+# Largest allowed difference from predict_proba() on the parity grid
+ONNX_PARITY_TOLERANCE = 1e-5
+
+
+def _file_sha256(path):
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _convert_model_to_onnx(model, n_features):
+    """
+    Convert the sklearn model to ONNX and save it next to the pickle.
+
+    Args:
+        model: Loaded sklearn classifier
+        n_features: Number of input features
+
+    Returns:
+        Path of the saved ONNX model, or serialized bytes if it could not be saved
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, n_features]))],
+        # Output probabilities as a plain tensor instead of a list of dicts
+        options={id(model): {"zipmap": False}}
+    )
+
+    # Record the source pickle so a retrained model invalidates this file
+    source_hash = onnx_model.metadata_props.add()
+    source_hash.key = ONNX_SOURCE_HASH_KEY
+    source_hash.value = _file_sha256(MODEL_PATH_ABS)
+
+    serialized = onnx_model.SerializeToString()
+
+    # Never save (or serve) a conversion that scores differently from sklearn
+    _check_onnx_parity(serialized, model)
+
+    # Mark the file as checked so later starts can serve it without unpickling
+    parity = onnx_model.metadata_props.add()
+    parity.key = ONNX_PARITY_KEY
+    parity.value = ONNX_PARITY_VERIFIED
+
+    serialized = onnx_model.SerializeToString()
+
+    try:
+        with open(ONNX_MODEL_PATH, "wb") as f:
+            f.write(serialized)
+        print(f"✅ ONNX model saved to: {os.path.abspath(ONNX_MODEL_PATH)}")
+        return ONNX_MODEL_PATH
+    except OSError as save_error:
+        print(f"⚠️  WARNING: Could not save ONNX model: {str(save_error)}")
+        return serialized
+
+
+def _snap_onnx_proba(probabilities):
+    """Snap float32 ONNX Runtime probabilities back to sklearn's float64 values."""
+    probabilities = probabilities.astype(np.float64)
+    snapped = np.round(probabilities, ONNX_SNAP_DECIMALS)
+    return np.where(np.abs(probabilities - snapped) <= ONNX_SNAP_TOLERANCE, snapped, probabilities)
+
+
+def _onnx_parity_grid():
+    """Build the feature rows of ONNX_PARITY_GRID as a float32 matrix."""
+    axes = np.meshgrid(
+        *[np.asarray(values, dtype=np.float32) for values in ONNX_PARITY_GRID],
+        indexing="ij"
+    )
+    return np.stack(axes, axis=-1).reshape(-1, len(ONNX_PARITY_GRID))
+
+
+def _check_onnx_parity(onnx_source, model):
+    """
+    Check that an ONNX model reproduces the sklearn model on ONNX_PARITY_GRID.
+
+    Both the probabilities and the confidence band of every grid row
+    (for every threshold the API applies) must match.
+
+    Args:
+        onnx_source: ONNX model path or serialized bytes
+        model: sklearn classifier the ONNX model was converted from
+
+    Raises:
+        ValueError: If the ONNX model disagrees with predict_proba()
+    """
+    session = _create_onnx_session(onnx_source, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+    features = _onnx_parity_grid()
+
+    onnx_proba = _snap_onnx_proba(
+        session.run([session.get_outputs()[-1].name], {session.get_inputs()[0].name: features})[0]
+    )
+    sklearn_proba = np.asarray(model.predict_proba(features), dtype=np.float64)
+
+    if onnx_proba.shape != sklearn_proba.shape:
+        raise ValueError(
+            f"ONNX output shape {onnx_proba.shape} does not match "
+            f"predict_proba() shape {sklearn_proba.shape}"
+        )
+
+    max_difference = float(np.abs(onnx_proba - sklearn_proba).max())
+    if max_difference > ONNX_PARITY_TOLERANCE:
+        raise ValueError(f"ONNX probabilities differ from predict_proba() by {max_difference}")
+
+    thresholds = np.sort(np.append(
+        ML_VERDICT_THRESHOLDS, (DECISIVE_SAFE_CONFIDENCE, PHISHING_HARD_THRESHOLD)
+    ))
+    column = 1 if sklearn_proba.shape[1] >= 2 else 0
+    onnx_bands = np.searchsorted(thresholds, onnx_proba[:, column], side="right")
+    sklearn_bands = np.searchsorted(thresholds, sklearn_proba[:, column], side="right")
+    if not np.array_equal(onnx_bands, sklearn_bands):
+        mismatched = features[onnx_bands != sklearn_bands]
+        raise ValueError(
+            f"ONNX confidence bands differ from predict_proba() for {len(mismatched)} "
+            f"feature rows, e.g. {mismatched[:3].tolist()}"
+        )
+
+    print(f"✅ ONNX model matches predict_proba() on {len(features)} feature rows")
+
+
+def _is_up_to_date(path, *sources):
+    """Check that a derived model file exists and is not older than its sources."""
+    path_stat = _stat_or_none(path)
+    if path_stat is None:
+        return False
+    for source in sources:
+        source_stat = _stat_or_none(source)
+        if source_stat is not None and source_stat.st_mtime > path_stat.st_mtime:
+            return False
+    return True
+
+
+def _create_onnx_session(model_source, optimization_level, optimized_model_path=None):
+    """
+    Create a CPU ONNX Runtime session.
+
+    Args:
+        model_source: ONNX model path or serialized bytes
+        optimization_level: ort.GraphOptimizationLevel to apply
+        optimized_model_path: If set, ONNX Runtime writes the optimized graph here
+
+    Returns:
+        ort.InferenceSession
+    """
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = optimization_level
+
+    # One thread per run: concurrency comes from request threads (run()
+    # releases the GIL), so per-session thread pools would oversubscribe cores
+    session_options.intra_op_num_threads = 1
+    session_options.inter_op_num_threads = 1
+    if optimized_model_path:
+        session_options.optimized_model_filepath = optimized_model_path
+
+    return ort.InferenceSession(
+        model_source,
+        sess_options=session_options,
+        providers=["CPUExecutionProvider"]
+    )
+
+
+def _load_onnx_session(onnx_source):
+    """
+    Create the serving ONNX Runtime session, reusing the optimized graph.
+
+    Args:
+        onnx_source: ONNX model path or serialized bytes
+
+    Returns:
+        ort.InferenceSession
+    """
+    # An in-memory model has no file to derive an optimized graph from
+    if not isinstance(onnx_source, str):
+        return _create_onnx_session(onnx_source, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+
+    # Write the optimized graph once. ORT_ENABLE_EXTENDED keeps the saved
+    # graph free of hardware-specific layout optimizations.
+    if not _is_up_to_date(ONNX_OPT_MODEL_PATH, onnx_source):
+        try:
+            print("🔄 Optimizing ONNX graph...")
+            _create_onnx_session(
+                onnx_source,
+                ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+                ONNX_OPT_MODEL_PATH
+            )
+        except Exception as optimize_error:
+            print(f"⚠️  WARNING: Could not save optimized ONNX graph: {str(optimize_error)}")
+
+    if _is_up_to_date(ONNX_OPT_MODEL_PATH, onnx_source):
+        # Graph is already optimized - skip optimization at load
+        onnx_session = _create_onnx_session(
+            ONNX_OPT_MODEL_PATH,
+            ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        )
+    else:
+        onnx_session = _create_onnx_session(
+            onnx_source,
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+
+    return onnx_session
+
+
+# ==================== MODEL INITIALIZATION ====================
+# Serve from the ONNX model when it matches the pickle; the pickle is only
+# unpickled to (re)create the ONNX model or as the sklearn fallback.
+
+ml_model = None
+ml_available = False  # Global flag to track ML availability
+
+onnx_session = None
+onnx_input_name = None
+onnx_proba_name = None
+
+if ort is None:
+    print("⚠️  WARNING: onnxruntime is not installed, using sklearn predict_proba()")
+
+try:
+    if ort is not None and os.path.exists(ONNX_MODEL_PATH):
+        print(f"📂 ONNX model path: {os.path.abspath(ONNX_MODEL_PATH)}")
+        onnx_session = _load_onnx_session(ONNX_MODEL_PATH)
+
+        # Regenerate if the pickle was replaced after conversion
+        metadata = onnx_session.get_modelmeta().custom_metadata_map
+        if (os.path.exists(MODEL_PATH_ABS)
+                and metadata.get(ONNX_SOURCE_HASH_KEY) != _file_sha256(MODEL_PATH_ABS)):
+            print("⚠️  ONNX model does not match phishing_model.pkl, reconverting")
+            onnx_session = None
+        elif metadata.get(ONNX_PARITY_KEY) != ONNX_PARITY_VERIFIED:
+            print("⚠️  ONNX model was not checked against predict_proba(), reconverting")
+            onnx_session = None
+
+except Exception as onnx_error:
+    print("⚠️  WARNING: Failed to load ONNX model")
+    print(f"   Error: {str(onnx_error)}")
+    onnx_session = None
+
+if onnx_session is None:
+    ml_model, ml_available = _load_sklearn_model()
+
+    if ort is not None and ml_available and hasattr(ml_model, 'predict_proba'):
+        try:
+            print("🔄 Converting ML model to ONNX...")
+            onnx_session = _load_onnx_session(_convert_model_to_onnx(ml_model, N_FEATURES))
+        except Exception as onnx_error:
+            print("⚠️  WARNING: ONNX conversion or session failed, using sklearn predict_proba()")
+            print(f"   Error: {str(onnx_error)}")
+            onnx_session = None
+
+if onnx_session is not None:
+    try:
+        # Validate feature compatibility
+        onnx_input = onnx_session.get_inputs()[0]
+        if onnx_input.shape[-1] != N_FEATURES:
+            raise ValueError(
+                f"ONNX model expects {onnx_input.shape[-1]} features "
+                f"but extractor provides {N_FEATURES}"
+            )
+
+        onnx_input_name = onnx_input.name
+        onnx_proba_name = onnx_session.get_outputs()[-1].name  # [label, probabilities]
+        ml_available = True
+        print("✅ ONNX Runtime session ready")
+
+    except Exception as onnx_error:
+        print("❌ ERROR: ONNX model is not compatible with the feature extractor")
+        print(f"   Error: {str(onnx_error)}")
+        onnx_session = None
+
+# ------------------ SKLEARN FOREST FAST PATH ------------------
+# Without ONNX Runtime, forest classifiers are evaluated tree by tree (as
+# predict_proba() does internally) to skip sklearn's per-call input
+# validation and joblib dispatch.
+forest_trees = None
+forest_n_classes = None
+
+if onnx_session is None and ml_available:
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+
+    if isinstance(ml_model, (RandomForestClassifier, ExtraTreesClassifier)) and ml_model.n_outputs_ == 1:
+        forest_trees = tuple(estimator.tree_ for estimator in ml_model.estimators_)
+        forest_n_classes = int(ml_model.n_classes_)
+        print(f"✅ Forest fast path ready ({len(forest_trees)} trees)")
+
+
+# ==================== ANALYSIS PIPELINE ====================
+
+# ------------------ FIXED RESPONSE BODIES ------------------
+# Built once and shared by every request that needs them (never mutated).
+
+# Response body for a URL that fails validate_url()
+INVALID_URL_RESPONSE = {
+    "verdict": "SUSPICIOUS",
+    "riskLevel": "Medium",
+    "confidence": 0.0,
+    "explanation": "URL format validation failed. The URL does not meet basic structural requirements for analysis.",
+    "evidence": [],
+    "checkedItems": ["URL format validation failed"],
+    "identificationTips": ["Ensure the URL has a valid format with a domain name"],
+    "actionSteps": ["Please provide a valid URL format", "Check for typos or missing protocol"]
+}
+
+
+# Response body for a URL whose ML features could not be extracted
+FEATURE_EXTRACTION_FAILED_RESPONSE = {
+    "verdict": "SUSPICIOUS",
+    "riskLevel": "Medium",
+    "confidence": 0.0,
+    "error": "Feature extraction failed",
+    "explanation": "An error occurred during feature extraction. Please verify the URL format.",
+    "evidence": [],
+    "checkedItems": ["Feature extraction failed"],
+    "identificationTips": ["Please verify the URL format and try again"],
+    "actionSteps": ["Retry the analysis", "Check the URL format"]
+}
+
+
+# Response body for an unexpected error in /api/analyze
+ANALYSIS_ERROR_RESPONSE = {
+    "verdict": "SUSPICIOUS",
+    "riskLevel": "Medium",
+    "confidence": 0.0,
+    "error": "Analysis failed due to internal error",
+    "explanation": "An unexpected error occurred during URL analysis. Please try again or contact support if the issue persists.",
+    "evidence": [],
+    "checkedItems": ["Analysis error occurred"],
+    "identificationTips": [
+        "Please verify the URL format and try again",
+        "Check your internet connection",
+        "If the problem persists, contact support"
+    ],
+    "actionSteps": [
+        "Retry the analysis",
+        "Verify the URL format",
+        "Check system status"
+    ]
+}
+
+
+# Placeholder rule result when the rule engine fails (ML-only analysis)
+RULE_ANALYSIS_UNAVAILABLE_RESULT = {
+    "evidence": [],
+    "checkedItems": ["Rule-based analysis unavailable"],
+    "identificationTips": ["ML analysis completed successfully"],
+    "actionSteps": ["Review ML analysis results"]
+}
+
+
+def _extract_ml_features(url, out=None, parsed=None):
+    """
+    Extract and validate ML features for a URL.
+
+    Args:
+        url: Stripped URL that passed validate_url()
+        out: Optional preallocated float32 row to write the features into
+        parsed: Optional parse_url() result for url
+
+    Returns:
+        float32 feature array in training order
+
+    Raises:
+        FeatureExtractionError: If ML feature extraction fails
+    """
+    try:
+        # Extract ML features (float32 array in training order - for ML model)
+        ml_features = extract_features_array(url, out=out, parsed=parsed)
+        
+        # Validate ML features
+        if not isinstance(ml_features, np.ndarray):
+            raise ValueError("ML feature extractor must return a numpy array")
+        if len(ml_features) == 0:
+            raise ValueError("ML feature extractor returned empty array")
+        
+    except Exception as e:
+        logger.error(f"❌ ML feature extraction error: {str(e)}")
+        raise FeatureExtractionError(str(e)) from e
+    
+    return ml_features
+
+
+def _rule_analysis(url, parsed=None):
+    """
+    Run rule feature extraction and the rule engine for explanations.
+
+    Args:
+        url: Stripped URL that passed validate_url()
+        parsed: Optional parse_url() result for url
+
+    Returns:
+        Rule engine result, or a placeholder result if the rule engine fails
+    """
+    try:
+        # Lowercase once for the feature extractor and the rule engine
+        lower_url = url.lower()
+        
+        # Extract rule features (DICT format - for explanations)
+        rule_features = feature_extractor.extract(url, parsed, lower_url)
+        
+        # Generate rule-based explanations (ML will override verdict)
+        return rule_engine.analyze(url, rule_features, lower_url)
+        
+    except Exception as e:
+        logger.error(f"❌ Rule feature extraction/analysis error: {str(e)}")
+        # Continue with ML-only analysis if rule engine fails
+        return RULE_ANALYSIS_UNAVAILABLE_RESULT
+
+
+def _explanation_rules(url, ml_confidence, prediction_succeeded, parsed=None):
+    """
+    Get the rule result used for evidence and explanations.
+
+    Decisive SAFE predictions use DECISIVE_SAFE_RULE_RESULT; everything
+    else (including the rule-based fallback) runs the rule engine.
+    """
+    if prediction_succeeded and ml_confidence < DECISIVE_SAFE_CONFIDENCE:
+        return DECISIVE_SAFE_RULE_RESULT
+    return _rule_analysis(url, parsed)
+
+
+def _forest_predict_proba(features):
+    """
+    Average the per-tree class probabilities of the forest fast path.
+
+    Matches RandomForestClassifier.predict_proba() for single-output forests.
+
+    Args:
+        features: float32 array of shape (n_urls, N_FEATURES)
+
+    Returns:
+        Array of class probabilities, shape (n_urls, n_classes)
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    probabilities = np.zeros((features.shape[0], forest_n_classes))
+    
+    for tree in forest_trees:
+        tree_proba = tree.predict(features)[:, :forest_n_classes]
+        normalizer = tree_proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        probabilities += tree_proba / normalizer
+    
+    probabilities /= len(forest_trees)
+    return probabilities
+
+
+def _onnx_predict_proba(features):
+    """Class probabilities from the ONNX Runtime session, snapped to sklearn's values."""
+    return _snap_onnx_proba(onnx_session.run([onnx_proba_name], {onnx_input_name: features})[0])
+
+
+def _label_predict_proba(features):
+    """
+    Class probabilities for a model that only has predict().
+
+    Binary prediction: 0 = SAFE, 1 = PHISHING. Default high / low
+    confidence since no probabilities are available.
+    """
+    phishing_probs = np.where(ml_model.predict(features) == 1, 0.8, 0.2)
+    return np.column_stack((1.0 - phishing_probs, phishing_probs))
+
+
+def _unsupported_predict_proba(features):
+    """Placeholder backend for a model without predict_proba() or predict()."""
+    raise ValueError("ML model does not support predict_proba or predict")
+
+
+# ------------------ PREDICTION BACKEND ------------------
+# Chosen once after model loading so requests call it directly instead of
+# re-checking which backend is available on every prediction.
+if onnx_session is not None:
+    _predict_proba = _onnx_predict_proba
+elif forest_trees is not None:
+    _predict_proba = _forest_predict_proba
+elif hasattr(ml_model, 'predict_proba'):
+    _predict_proba = ml_model.predict_proba
+elif hasattr(ml_model, 'predict'):
+    _predict_proba = _label_predict_proba
+else:
+    _predict_proba = _unsupported_predict_proba
+
+
+def _predict_confidences(features):
+    """
+    Predict the phishing confidence for each row of a feature matrix.
+
+    Args:
+        features: float32 array of shape (n_urls, N_FEATURES)
+
+    Returns:
+        Array of phishing confidences (0.0 to 1.0), one per row
+    """
+    # Validate feature vector length against N_FEATURES
+    if features.shape[1] != N_FEATURES:
+        raise ValueError(
+            f"Feature vector length mismatch: model expects {N_FEATURES} features, "
+            f"but extractor returned {features.shape[1]}. "
+            f"This indicates a mismatch between training and inference feature extraction."
+        )
+    
+    probabilities = _predict_proba(features)
+    
+    # Handle binary classification: [safe_prob, phishing_prob]
+    if probabilities.shape[1] >= 2:
+        phishing_probs = probabilities[:, 1]  # Phishing probability
+    else:
+        phishing_probs = probabilities[:, 0]  # Fallback
+    
+    # Ensure confidence is valid (0.0 to 1.0)
+    return np.clip(phishing_probs.astype(np.float64), 0.0, 1.0)
+
+
+def _ml_verdicts(confidences):
+    """
+    Apply the ML decision thresholds to an array of confidences.
+
+    Thresholds:
+        - >= 0.7 → PHISHING
+        - 0.4 - 0.69 → SUSPICIOUS
+        - < 0.4 → SAFE
+    """
+    bands = np.searchsorted(ML_VERDICT_THRESHOLDS, confidences, side="right")
+    return ML_VERDICT_TABLE[bands].tolist()
+
+
+def _ml_decisions(features):
+    """
+    Run the ML model (primary authority) on a feature matrix.
+
+    Args:
+        features: float32 array of shape (n_urls, N_FEATURES)
+
+    Returns:
+        Tuple of (verdicts, confidences, prediction_succeeded). On failure or
+        when the model is unavailable, verdicts are None and confidences 0.0
+        so callers fall back to rule-based analysis.
+    """
+    n_urls = features.shape[0]
+    
+    # Only attempt ML prediction if model is loaded and available
+    if not ml_available or n_urls == 0:
+        return [None] * n_urls, [0.0] * n_urls, False
+    
+    try:
+        confidences = _predict_confidences(features)
+        verdicts = _ml_verdicts(confidences)
+        confidences = confidences.tolist()
+        
+        for verdict, confidence in zip(verdicts, confidences):
+            logger.info(f"✅ ML prediction: {verdict} (confidence: {confidence:.2%})")
+        
+        return verdicts, confidences, True
+        
+    except Exception as e:
+        # Log prediction failure (full traceback only in debug mode)
+        error_msg = str(e)
+        logger.error(f"❌ ML prediction error: {error_msg}")
+        logger.error(f"   Feature matrix shape: {features.shape}")
+        logger.error(f"   Feature vectors: {features.tolist()}")
+        logger.debug("   Full traceback:", exc_info=True)
+        
+        # Check if it's a feature mismatch error
+        if "features" in error_msg.lower() and "expecting" in error_msg.lower():
+            logger.error("   ⚠️  CRITICAL: Feature count mismatch between model and extractor!")
+            logger.error("   ⚠️  This indicates the model was trained with different features.")
+            logger.error("   ⚠️  Please verify the model training feature set matches extract_features().")
+        
+        # Prediction failed - will fall through to rule-based fallback
+        return [None] * n_urls, [0.0] * n_urls, False
+
+
+def _build_response(url, rule_result, ml_verdict, ml_confidence, prediction_succeeded, parsed=None):
+    """
+    Apply the post-ML hardening layers (or rule fallback) and build the response.
+
+    Args:
+        url: Analyzed URL
+        rule_result: Result from _rule_analysis()
+        ml_verdict: ML verdict, or None if prediction did not succeed
+        ml_confidence: ML phishing confidence (0.0 to 1.0)
+        prediction_succeeded: Whether ML prediction succeeded for this URL
+        parsed: Optional parse_url() result for url
+
+    Returns:
+        Response dictionary for /api/analyze
+    """
+    # Hostname from the shared parse when available (same as extract_domain())
+    domain = (parsed.hostname if parsed is not None else extract_domain(url)) or ""
+    
+    # ========== POST-ML HARDENING LAYERS ==========
+    # These layers run AFTER ML prediction to ensure correctness
+    # and prevent false positives without modifying ML confidence.
+    
+    trusted_domain_override = False
+    confidence_gating_applied = False
+    private_ip_detected = False
+
+    if ml_available:
+        # ========== LAYER 1: TRUSTED DOMAIN OVERRIDE ==========
+        # Match base domains and subdomains, e.g. en.wikipedia.org → wikipedia.org
+        is_trusted = domain in TRUSTED_DOMAINS or domain.endswith(TRUSTED_DOMAIN_SUFFIXES)
+        if is_trusted and ml_verdict == "PHISHING":
+            # ML says PHISHING with high confidence, but domain is trusted.
+            # Override final verdict to SAFE / Low risk while keeping ML confidence.
+            trusted_domain_override = True
+            ml_verdict = "SAFE"
+        
+        # ========== LAYER 2: CONFIDENCE GATING (ANTI-PANIC) ==========
+        # Prevent over-claiming: downgrade PHISHING if confidence is not strong enough.
+        if ml_verdict == "PHISHING" and ml_confidence < PHISHING_HARD_THRESHOLD:
+            # ML flagged as PHISHING but confidence is below hard threshold.
+            # Downgrade to SUSPICIOUS to prevent false alarms.
+            confidence_gating_applied = True
+            ml_verdict = "SUSPICIOUS"
+        
+        # ========== LAYER 3: PRIVATE / INTERNAL IP HANDLING ==========
+        # Private IPs (192.168.x.x, 10.x.x.x, 172.16.x.x) are not phishing websites.
+        # They are internal network addresses, commonly used for routers or internal systems.
+        try:
+            # Only IP literals can be private addresses: IPv4 starts with a digit
+            # and IPv6 contains ':'. Plain hostnames skip the ipaddress parse.
+            if domain and (domain[0].isdigit() or ":" in domain):
+                # Try to parse as IP address
+                ip_obj = ipaddress.ip_address(domain)
+                if ip_obj.is_private:
+                    # This is a private/internal IP address
+                    private_ip_detected = True
+                    # Override to SUSPICIOUS (not PHISHING) with Medium risk
+                    if ml_verdict == "PHISHING":
+                        ml_verdict = "SUSPICIOUS"
+        except (ValueError, AttributeError):
+            # Not an IP address, continue normally
+            pass
+
+    # ========== FALLBACK TO RULE-BASED (if ML unavailable or prediction failed) ==========
+    
+    if not prediction_succeeded:
+        # SAFE DOMAIN ALLOWLIST (fallback mode only)
+        if domain in FALLBACK_SAFE_DOMAINS:
+            # Known trusted domain in fallback mode
+            ml_verdict = "SAFE"
+            risk_level = "Low"
+            ml_confidence = 0.0
+            explanation = (
+                "Preliminary analysis (ML unavailable): "
+                "This URL belongs to a well-known trusted domain. ML analysis is unavailable."
+            )
+        else:
+            # Use rule-based verdict as a hint, but cap severity
+            base_verdict = rule_result.get("verdict", "SUSPICIOUS")
+            
+            # Never allow PHISHING in fallback mode
+            if base_verdict == "PHISHING":
+                ml_verdict = "SUSPICIOUS"
+            elif base_verdict in ("SAFE", "SUSPICIOUS"):
+                ml_verdict = base_verdict
+            else:
+                ml_verdict = "SUSPICIOUS"
+
+            # Cap risk level at Medium in fallback mode
+            if ml_verdict == "SAFE":
+                risk_level = "Low"
+            else:
+                risk_level = "Medium"
+
+            ml_confidence = 0.0
+            explanation = (
+                "Preliminary analysis (ML unavailable): "
+                + rule_result.get(
+                    "explanation",
+                    "Some indicators were detected, but ML analysis is unavailable."
+                )
+            )
+
+        logger.warning("⚠️  Using rule-based fallback (ML model unavailable or prediction failed)")
+    else:
+        # ========== DETERMINE RISK LEVEL ==========
+        
+        if ml_verdict == "PHISHING":
+            risk_level = "High"
+        elif ml_verdict == "SUSPICIOUS":
+            risk_level = "Medium"
+        else:
+            risk_level = "Low"
+        
+        # ========== GENERATE ML-BASED EXPLANATION (WITH TRANSPARENCY) ==========
+        # Every explanation clearly states what happened and why.
+        
+        if trusted_domain_override:
+            # Mode: ML decision + trusted domain adjustment
+            explanation = (
+                "Although the ML model detected phishing-like patterns, this URL "
+                "belongs to a well-known trusted domain. The verdict was adjusted "
+                "to prevent false positives. "
+                f"(ML phishing confidence: {ml_confidence:.1%})."
+            )
+            # Ensure risk level is Low for trusted overrides
+            risk_level = "Low"
+        elif private_ip_detected:
+            # Mode: ML decision + private IP handling
+            explanation = (
+                f"This URL points to a private/internal IP address ({domain}). "
+                f"These addresses (192.168.x.x, 10.x.x.x, 172.16.x.x) are commonly used "
+                f"for routers or internal systems and are not phishing websites. "
+                f"However, accessing them unexpectedly may indicate a security concern. "
+                f"(ML analysis confidence: {ml_confidence:.1%})."
+            )
+            # Ensure risk level is Medium for private IPs
+            risk_level = "Medium"
+        elif confidence_gating_applied:
+            # Mode: ML decision + confidence gating
+            explanation = (
+                f"We evaluated multiple technical indicators using machine learning analysis. "
+                f"Some indicators were detected (confidence: {ml_confidence:.1%}), "
+                f"but the confidence level is not strong enough to confidently classify this as phishing. "
+                f"Caution is advised when visiting this URL."
+            )
+            # Risk level already set to Medium above
+        elif ml_verdict == "PHISHING":
+            # Mode: Pure ML decision (high confidence phishing)
+            explanation = (
+                f"We evaluated multiple technical indicators using machine learning analysis. "
+                f"Strong phishing indicators were detected (confidence: {ml_confidence:.1%}). "
+                f"This URL is highly likely to be a phishing attempt."
+            )
+        elif ml_verdict == "SUSPICIOUS":
+            # Mode: Pure ML decision (moderate confidence)
+            explanation = (
+                f"We evaluated multiple technical indicators using machine learning analysis. "
+                f"Some warning signs were detected (confidence: {ml_confidence:.1%}). "
+                f"Caution is advised when visiting this URL."
+            )
+        else:
+            # Mode: Pure ML decision (low confidence / safe)
+            explanation = (
+                f"We evaluated multiple technical indicators using machine learning analysis. "
+                f"No significant phishing indicators were detected (confidence: {ml_confidence:.1%}). "
+                f"However, always verify the authenticity of websites before entering sensitive information."
+            )
+    
+    # ========== BUILD RESPONSE ==========
+    
+    response = {
+        "verdict": ml_verdict,  # ML verdict (or rule fallback, possibly adjusted by hardening layers)
+        "riskLevel": risk_level,
+        "confidence": round(ml_confidence * 100, 2),  # Percentage (always preserved from ML)
+        "mlAvailable": prediction_succeeded,
+        "explanation": explanation,  # Transparent explanation of decision and any adjustments
+        "evidence": rule_result["evidence"],  # From rule engine
+        "checkedItems": rule_result["checkedItems"],  # From rule engine
+        "identificationTips": rule_result["identificationTips"],  # From rule engine
+        "actionSteps": rule_result["actionSteps"],  # From rule engine
+        "verificationSources": VERIFICATION_SOURCES  # External verification tools for user trust
+    }
+    
+    return response
+
+
+# Per-thread (1, N_FEATURES) model input buffer, reused across requests
+_thread_local = threading.local()
+
+
+def _feature_buffer():
+    """Get this thread's reusable float32 model input buffer."""
+    buffer = getattr(_thread_local, "features", None)
+    if buffer is None:
+        buffer = _thread_local.features = np.empty((1, N_FEATURES), dtype=np.float32)
+    return buffer
+
+
+@functools.lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze_cached(url):
+    """
+    Run feature extraction, ML prediction and rule analysis for a URL.
+
+    Results are cached per URL so repeat submissions skip the whole
+    pipeline. The returned dict is shared between requests and must
+    not be mutated.
+
+    Args:
+        url: Stripped URL that passed validate_url()
+
+    Returns:
+        Response dictionary for /api/analyze
+
+    Raises:
+        FeatureExtractionError: If ML feature extraction fails
+        PredictionFailedError: If ML prediction fails or the model is unavailable
+    """
+    # Parse once; the feature extractors and hardening layers share the result
+    parsed = parse_url(url)
+    
+    # Features are written straight into the thread's (1, n_features) buffer
+    ml_features = _feature_buffer()
+    _extract_ml_features(url, out=ml_features[0], parsed=parsed)
+    
+    verdicts, confidences, prediction_succeeded = _ml_decisions(ml_features)
+    
+    # Keep the rule-based fallback out of the cache so the URL is retried
+    if not prediction_succeeded:
+        raise PredictionFailedError(url)
+    
+    rule_result = _explanation_rules(url, confidences[0], prediction_succeeded, parsed)
+    
+    return _build_response(
+        url, rule_result, verdicts[0], confidences[0], prediction_succeeded, parsed
+    )
+
+
+def _analyze_fallback(url):
+    """
+    Build the rule-based response for a URL the ML model could not score.
+
+    Args:
+        url: Stripped URL that passed validate_url()
+
+    Returns:
+        Response dictionary for /api/analyze
+    """
+    parsed = parse_url(url)
+    rule_result = _explanation_rules(url, 0.0, False, parsed)
+    return _build_response(url, rule_result, None, 0.0, False, parsed)
+
 
 # ==================== API ENDPOINTS ====================
 
@@ -237,346 +1278,115 @@ def analyze_url():
         # NOTE: Validation is intentionally loose to allow suspicious URLs
         # to be analyzed by ML and rules rather than rejected early
         if not validate_url(url):
+            return jsonify(INVALID_URL_RESPONSE), 400
+        
+        # ========== ANALYSIS (CACHED PER URL) ==========
+        
+        try:
+            response = _analyze_cached(url)
+        except FeatureExtractionError:
+            return jsonify(FEATURE_EXTRACTION_FAILED_RESPONSE), 500
+        except PredictionFailedError:
+            response = _analyze_fallback(url)
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        # Comprehensive error handling (full traceback only in debug mode)
+        logger.error(f"❌ Analysis error: {str(e)}")
+        logger.debug("   Traceback:", exc_info=True)
+        
+        return jsonify(ANALYSIS_ERROR_RESPONSE), 500
+
+
+@app.route("/api/analyze_batch", methods=["POST"])
+@app.route("/api/analyze-batch", methods=["POST"])
+def analyze_batch():
+    """
+    Analyze several URLs with a single ML inference call.
+    
+    Feature vectors for all valid URLs are stacked into one
+    (n_urls, n_features) matrix so the model runs once per batch.
+    
+    Request Body (JSON):
+        {
+            "urls": ["http://example.com", "http://login-paypa1.tk"]
+        }
+    
+    Response Body (JSON):
+        {
+            "results": [...]  # One /api/analyze response per URL, in request order
+        }
+    """
+    try:
+        # ========== REQUEST VALIDATION ==========
+        # silent=True: a missing or malformed body gets the 400 below, not a 500
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or not isinstance(data.get("urls"), list):
+            return jsonify({"error": "A list of URLs is required"}), 400
+        
+        urls = data["urls"]
+        
+        if len(urls) > MAX_BATCH_URLS:
             return jsonify({
-                "verdict": "SUSPICIOUS",
-                "riskLevel": "Medium",
-                "confidence": 0.0,
-                "explanation": "URL format validation failed. The URL does not meet basic structural requirements for analysis.",
-                "evidence": [],
-                "checkedItems": ["URL format validation failed"],
-                "identificationTips": ["Ensure the URL has a valid format with a domain name"],
-                "actionSteps": ["Please provide a valid URL format", "Check for typos or missing protocol"]
+                "error": f"Too many URLs (maximum {MAX_BATCH_URLS} per request)"
             }), 400
         
         # ========== FEATURE EXTRACTION ==========
         
-        try:
-            # Extract ML features (LIST format - for ML model)
-            ml_features = extract_features(url)
-            
-            # Validate ML features
-            if not isinstance(ml_features, list):
-                raise ValueError("ML feature extractor must return a list")
-            if len(ml_features) == 0:
-                raise ValueError("ML feature extractor returned empty list")
-            
-        except Exception as e:
-            print(f"❌ ML feature extraction error: {str(e)}")
-            return jsonify({
-                "verdict": "SUSPICIOUS",
-                "riskLevel": "Medium",
-                "confidence": 0.0,
-                "error": "Feature extraction failed",
-                "explanation": "An error occurred during feature extraction. Please verify the URL format.",
-                "evidence": [],
-                "checkedItems": ["Feature extraction failed"],
-                "identificationTips": ["Please verify the URL format and try again"],
-                "actionSteps": ["Retry the analysis", "Check the URL format"]
-            }), 500
+        results = [None] * len(urls)
+        analyzed = []  # (result index, url, parsed url) for each row of ml_features
+        ml_features = np.empty((len(urls), N_FEATURES), dtype=np.float32)
         
-        try:
-            # Extract rule features (DICT format - for explanations)
-            rule_features = feature_extractor.extract(url)
+        for index, raw_url in enumerate(urls):
+            url = raw_url.strip() if isinstance(raw_url, str) else ""
             
-            # Generate rule-based explanations (ML will override verdict)
-            rule_result = rule_engine.analyze(url, rule_features)
+            if not url or not validate_url(url):
+                results[index] = INVALID_URL_RESPONSE
+                continue
             
-        except Exception as e:
-            print(f"❌ Rule feature extraction/analysis error: {str(e)}")
-            # Continue with ML-only analysis if rule engine fails
-            rule_result = {
-                "evidence": [],
-                "checkedItems": ["Rule-based analysis unavailable"],
-                "identificationTips": ["ML analysis completed successfully"],
-                "actionSteps": ["Review ML analysis results"]
-            }
-        
-        # ========== ML DECISION (PRIMARY AUTHORITY) ==========
-        
-        ml_verdict = None
-        ml_confidence = 0.0
-        prediction_succeeded = False  # Track if THIS prediction succeeded
-        
-        # Only attempt ML prediction if model is loaded and available
-        if ml_model is not None and ml_available:
-            try:
-                # Validate feature vector length using get_feature_count()
-                expected_features = get_feature_count()
-                if len(ml_features) != expected_features:
-                    raise ValueError(
-                        f"Feature vector length mismatch: model expects {expected_features} features, "
-                        f"but extractor returned {len(ml_features)}. "
-                        f"This indicates a mismatch between training and inference feature extraction."
-                    )
-                
-                # Get ML prediction probabilities
-                if hasattr(ml_model, 'predict_proba'):
-                    probabilities = ml_model.predict_proba([ml_features])[0]
-                    
-                    # Handle binary classification: [safe_prob, phishing_prob]
-                    if len(probabilities) >= 2:
-                        phishing_prob = probabilities[1]  # Phishing probability
-                    else:
-                        phishing_prob = probabilities[0]  # Fallback
-                    
-                    ml_confidence = float(phishing_prob)
-                    
-                    # Ensure confidence is valid (0.0 to 1.0)
-                    ml_confidence = max(0.0, min(1.0, ml_confidence))
-                    
-                    # Apply ML thresholds
-                    if ml_confidence >= 0.7:
-                        ml_verdict = "PHISHING"
-                    elif ml_confidence >= 0.4:
-                        ml_verdict = "SUSPICIOUS"
-                    else:
-                        ml_verdict = "SAFE"
-                    
-                    prediction_succeeded = True
-                    print(f"✅ ML prediction: {ml_verdict} (confidence: {ml_confidence:.2%})")
-                        
-                elif hasattr(ml_model, 'predict'):
-                    # Binary prediction: 0 = SAFE, 1 = PHISHING
-                    prediction = ml_model.predict([ml_features])[0]
-                    if prediction == 1:
-                        ml_verdict = "PHISHING"
-                        ml_confidence = 0.8  # Default high confidence
-                    else:
-                        ml_verdict = "SAFE"
-                        ml_confidence = 0.2  # Default low confidence
-                    
-                    prediction_succeeded = True
-                    print(f"✅ ML prediction: {ml_verdict} (binary classification)")
-                else:
-                    raise ValueError("ML model does not support predict_proba or predict")
-                    
-            except Exception as e:
-                # Log prediction failure with full traceback
-                error_msg = str(e)
-                print(f"❌ ML prediction error: {error_msg}")
-                print(f"   Feature vector length: {len(ml_features)}")
-                print(f"   Feature vector: {ml_features}")
-                print(f"   Full traceback:\n{traceback.format_exc()}")
-                
-                # Check if it's a feature mismatch error
-                if "features" in error_msg.lower() and "expecting" in error_msg.lower():
-                    print("   ⚠️  CRITICAL: Feature count mismatch between model and extractor!")
-                    print("   ⚠️  This indicates the model was trained with different features.")
-                    print("   ⚠️  Please verify the model training feature set matches extract_features().")
-                
-                # Prediction failed - will fall through to rule-based fallback
-                prediction_succeeded = False
-        elif ml_model is None or not ml_available:
-            # Model not loaded or not available - will use fallback
-            prediction_succeeded = False
-        
-        # ========== POST-ML HARDENING LAYERS ==========
-        # These layers run AFTER ML prediction to ensure correctness
-        # and prevent false positives without modifying ML confidence.
-        
-        trusted_domain_override = False
-        confidence_gating_applied = False
-        private_ip_detected = False
-
-        if ml_available:
-            domain = extract_domain(url) or ""
-            
-            
-            # ========== LAYER 1: TRUSTED DOMAIN OVERRIDE ==========
-            # Match base domains and subdomains, e.g. en.wikipedia.org → wikipedia.org
-            is_trusted = any(
-                domain == trusted or domain.endswith(f".{trusted}")
-                for trusted in TRUSTED_DOMAINS
-            )
-            if is_trusted and ml_verdict == "PHISHING":
-                # ML says PHISHING with high confidence, but domain is trusted.
-                # Override final verdict to SAFE / Low risk while keeping ML confidence.
-                trusted_domain_override = True
-                ml_verdict = "SAFE"
-            
-            # ========== LAYER 2: CONFIDENCE GATING (ANTI-PANIC) ==========
-            # Prevent over-claiming: downgrade PHISHING if confidence is not strong enough.
-            if ml_verdict == "PHISHING" and ml_confidence < PHISHING_HARD_THRESHOLD:
-                # ML flagged as PHISHING but confidence is below hard threshold.
-                # Downgrade to SUSPICIOUS to prevent false alarms.
-                confidence_gating_applied = True
-                ml_verdict = "SUSPICIOUS"
+            parsed = parse_url(url)
             
-            # ========== LAYER 3: PRIVATE / INTERNAL IP HANDLING ==========
-            # Private IPs (192.168.x.x, 10.x.x.x, 172.16.x.x) are not phishing websites.
-            # They are internal network addresses, commonly used for routers or internal systems.
             try:
-                if domain:
-                    # Try to parse as IP address
-                    ip_obj = ipaddress.ip_address(domain)
-                    if ip_obj.is_private:
-                        # This is a private/internal IP address
-                        private_ip_detected = True
-                        # Override to SUSPICIOUS (not PHISHING) with Medium risk
-                        if ml_verdict == "PHISHING":
-                            ml_verdict = "SUSPICIOUS"
-            except (ValueError, AttributeError):
-                # Not an IP address, continue normally
-                pass
-
-        # ========== FALLBACK TO RULE-BASED (if ML unavailable or prediction failed) ==========
-        
-        if not prediction_succeeded:
-            # SAFE DOMAIN ALLOWLIST (fallback mode only)
-            domain = extract_domain(url) or ""
-            safe_domains = {
-                "google.com",
-                "www.google.com",
-                "accounts.google.com",
-            }
-
-            if domain in safe_domains:
-                # Known trusted domain in fallback mode
-                ml_verdict = "SAFE"
-                risk_level = "Low"
-                ml_confidence = 0.0
-                explanation = (
-                    "Preliminary analysis (ML unavailable): "
-                    "This URL belongs to a well-known trusted domain. ML analysis is unavailable."
-                )
-            else:
-                # Use rule-based verdict as a hint, but cap severity
-                base_verdict = rule_result.get("verdict", "SUSPICIOUS")
-                
-                # Never allow PHISHING in fallback mode
-                if base_verdict == "PHISHING":
-                    ml_verdict = "SUSPICIOUS"
-                elif base_verdict in ("SAFE", "SUSPICIOUS"):
-                    ml_verdict = base_verdict
-                else:
-                    ml_verdict = "SUSPICIOUS"
-
-                # Cap risk level at Medium in fallback mode
-                if ml_verdict == "SAFE":
-                    risk_level = "Low"
-                else:
-                    risk_level = "Medium"
-
-                ml_confidence = 0.0
-                explanation = (
-                    "Preliminary analysis (ML unavailable): "
-                    + rule_result.get(
-                        "explanation",
-                        "Some indicators were detected, but ML analysis is unavailable."
-                    )
-                )
-
-            print("⚠️  Using rule-based fallback (ML model unavailable or prediction failed)")
-        else:
-            # ========== DETERMINE RISK LEVEL ==========
+                _extract_ml_features(url, out=ml_features[len(analyzed)], parsed=parsed)
+            except FeatureExtractionError:
+                results[index] = FEATURE_EXTRACTION_FAILED_RESPONSE
+                continue
             
-            if ml_verdict == "PHISHING":
-                risk_level = "High"
-            elif ml_verdict == "SUSPICIOUS":
-                risk_level = "Medium"
-            else:
-                risk_level = "Low"
-            
-            # ========== GENERATE ML-BASED EXPLANATION (WITH TRANSPARENCY) ==========
-            # Every explanation clearly states what happened and why.
-            
-            if trusted_domain_override:
-                # Mode: ML decision + trusted domain adjustment
-                explanation = (
-                    "Although the ML model detected phishing-like patterns, this URL "
-                    "belongs to a well-known trusted domain. The verdict was adjusted "
-                    "to prevent false positives. "
-                    f"(ML phishing confidence: {ml_confidence:.1%})."
-                )
-                # Ensure risk level is Low for trusted overrides
-                risk_level = "Low"
-            elif private_ip_detected:
-                # Mode: ML decision + private IP handling
-                explanation = (
-                    f"This URL points to a private/internal IP address ({domain}). "
-                    f"These addresses (192.168.x.x, 10.x.x.x, 172.16.x.x) are commonly used "
-                    f"for routers or internal systems and are not phishing websites. "
-                    f"However, accessing them unexpectedly may indicate a security concern. "
-                    f"(ML analysis confidence: {ml_confidence:.1%})."
-                )
-                # Ensure risk level is Medium for private IPs
-                risk_level = "Medium"
-            elif confidence_gating_applied:
-                # Mode: ML decision + confidence gating
-                explanation = (
-                    f"We evaluated multiple technical indicators using machine learning analysis. "
-                    f"Some indicators were detected (confidence: {ml_confidence:.1%}), "
-                    f"but the confidence level is not strong enough to confidently classify this as phishing. "
-                    f"Caution is advised when visiting this URL."
-                )
-                # Risk level already set to Medium above
-            elif ml_verdict == "PHISHING":
-                # Mode: Pure ML decision (high confidence phishing)
-                explanation = (
-                    f"We evaluated multiple technical indicators using machine learning analysis. "
-                    f"Strong phishing indicators were detected (confidence: {ml_confidence:.1%}). "
-                    f"This URL is highly likely to be a phishing attempt."
-                )
-            elif ml_verdict == "SUSPICIOUS":
-                # Mode: Pure ML decision (moderate confidence)
-                explanation = (
-                    f"We evaluated multiple technical indicators using machine learning analysis. "
-                    f"Some warning signs were detected (confidence: {ml_confidence:.1%}). "
-                    f"Caution is advised when visiting this URL."
-                )
-            else:
-                # Mode: Pure ML decision (low confidence / safe)
-                explanation = (
-                    f"We evaluated multiple technical indicators using machine learning analysis. "
-                    f"No significant phishing indicators were detected (confidence: {ml_confidence:.1%}). "
-                    f"However, always verify the authenticity of websites before entering sensitive information."
-                )
+            analyzed.append((index, url, parsed))
         
-        # ========== BUILD RESPONSE ==========
-        
-        response = {
-            "verdict": ml_verdict,  # ML verdict (or rule fallback, possibly adjusted by hardening layers)
-            "riskLevel": risk_level,
-            "confidence": round(ml_confidence * 100, 2),  # Percentage (always preserved from ML)
-            "mlAvailable": prediction_succeeded,
-            "explanation": explanation,  # Transparent explanation of decision and any adjustments
-            "evidence": rule_result["evidence"],  # From rule engine
-            "checkedItems": rule_result["checkedItems"],  # From rule engine
-            "identificationTips": rule_result["identificationTips"],  # From rule engine
-            "actionSteps": rule_result["actionSteps"],  # From rule engine
-            "verificationSources": VERIFICATION_SOURCES  # External verification tools for user trust
-        }
+        # ========== ML DECISION (ONE CALL FOR ALL ROWS) ==========
         
-        return jsonify(response), 200
+        verdicts, confidences, prediction_succeeded = _ml_decisions(ml_features[:len(analyzed)])
+        
+        # ========== RULES, HARDENING AND RESPONSES ==========
+        
+        for (index, url, parsed), ml_verdict, ml_confidence in zip(analyzed, verdicts, confidences):
+            rule_result = _explanation_rules(url, ml_confidence, prediction_succeeded, parsed)
+            results[index] = _build_response(
+                url, rule_result, ml_verdict, ml_confidence, prediction_succeeded, parsed
+            )
+        
+        return jsonify({"results": results}), 200
         
     except Exception as e:
-        # Comprehensive error handling
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"❌ Analysis error: {str(e)}")
-        print(f"   Traceback: {error_trace}")
+        logger.error(f"❌ Batch analysis error: {str(e)}")
+        logger.debug("   Traceback:", exc_info=True)
         
         return jsonify({
-            "verdict": "SUSPICIOUS",
-            "riskLevel": "Medium",
-            "confidence": 0.0,
-            "error": "Analysis failed due to internal error",
-            "explanation": "An unexpected error occurred during URL analysis. Please try again or contact support if the issue persists.",
-            "evidence": [],
-            "checkedItems": ["Analysis error occurred"],
-            "identificationTips": [
-                "Please verify the URL format and try again",
-                "Check your internet connection",
-                "If the problem persists, contact support"
-            ],
-            "actionSteps": [
-                "Retry the analysis",
-                "Verify the URL format",
-                "Check system status"
-            ]
+            "error": "Batch analysis failed due to internal error"
         }), 500
 
 
+# Health status is fixed once the model is loaded, so the body is encoded once
+HEALTH_RESPONSE_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "AtomGuard API",
+    "ml_model_loaded": ml_available
+})
+
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """
@@ -585,18 +1395,16 @@ def health_check():
     Returns:
         JSON with service status
     """
-    return jsonify({
-        "status": "healthy",
-        "service": "AtomGuard API",
-        "ml_model_loaded": ml_available
-    }), 200
+    return HEALTH_RESPONSE_BODY, 200, {"Content-Type": "application/json"}
 
 
 # ==================== APPLICATION ENTRY POINT ====================
 
 if __name__ == "__main__":
+    # Development server only - use gunicorn.conf.py for production
     port = int(os.environ.get("PORT", 5000))
     host = os.environ.get("HOST", "0.0.0.0")
+    debug = os.environ.get("FLASK_DEBUG", "0") == "1"
     
     print("\n" + "="*50)
     print("🚀 AtomGuard Backend API Starting...")
@@ -606,9 +1414,10 @@ if __name__ == "__main__":
     print(f"🤖 ML Model: {'✅ Available' if ml_available else '❌ Not Available'}")
     if ml_available:
         print(f"   Model path: {MODEL_PATH_ABS}")
-        print(f"   Feature count: {get_feature_count()}")
+        print(f"   Feature count: {N_FEATURES}")
     else:
         print(f"   Model path checked: {MODEL_PATH_ABS}")
+    print("⚠️  Development server - for production run: gunicorn -c gunicorn.conf.py app:app")
     print("="*50 + "\n")
     
-    app.run(host=host, port=port, debug=True)
+    app.run(host=host, port=port, debug=debug, threaded=True)
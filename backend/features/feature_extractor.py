@@ -5,109 +5,127 @@ Extracts numerical features from URLs for analysis and explanation
 """
 
 import re
-from urllib.parse import urlparse
-from typing import Dict, List
+from urllib.parse import urlparse, ParseResult, SplitResult
+from typing import Dict, List, Optional, Union
+
+
+# Built once at import time (tuples so str.endswith can take them directly)
+SUSPICIOUS_TLDS = ('.tk', '.ml', '.ga', '.cf', '.gq', '.xyz')
+SUSPICIOUS_KEYWORDS = (
+    'login', 'signin', 'verify', 'secure', 'update', 'confirm',
+    'account', 'password', 'credential', 'payment', 'billing'
+)
+KNOWN_BRANDS = (
+    'paypal', 'amazon', 'google', 'microsoft', 'apple',
+    'facebook', 'twitter', 'bank', 'ebay', 'netflix'
+)
+IP_PATTERN = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
 
 
 class FeatureExtractor:
     """Extract features from URLs for phishing detection"""
 
-    def __init__(self):
-        self.suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz']
-        self.suspicious_keywords = [
-            'login', 'signin', 'verify', 'secure', 'update', 'confirm',
-            'account', 'password', 'credential', 'payment', 'billing'
-        ]
-        self.known_brands = [
-            'paypal', 'amazon', 'google', 'microsoft', 'apple',
-            'facebook', 'twitter', 'bank', 'ebay', 'netflix'
-        ]
+    __slots__ = ('suspicious_tlds', 'suspicious_keywords', 'known_brands')
 
-    def extract(self, url: str) -> Dict[str, float]:
+    def __init__(self):
+        self.suspicious_tlds = SUSPICIOUS_TLDS
+        self.suspicious_keywords = SUSPICIOUS_KEYWORDS
+        self.known_brands = KNOWN_BRANDS
+
+    def extract(
+        self,
+        url: str,
+        parsed: Optional[Union[SplitResult, ParseResult]] = None,
+        lower_url: Optional[str] = None
+    ) -> Dict[str, float]:
         """
         Extract features from a URL
 
         Args:
             url: URL string to analyze
+            parsed: Optional parse_url() result for the same URL (with protocol),
+                reused instead of parsing the URL again
+            lower_url: Optional url.lower(), reused for the keyword and brand
+                checks instead of lowercasing the URL again
 
         Returns:
             Dictionary of feature names and numeric values
         """
-        features: Dict[str, float] = {}
+        # Keyword/brand matching text. No keyword or brand contains '/', so a
+        # match cannot involve an added https:// prefix.
+        full_url = lower_url if lower_url is not None else url.lower()
 
         # Safe URL parsing
         try:
             if not url.startswith(('http://', 'https://')):
                 url = 'https://' + url
 
-            parsed = urlparse(url)
+            if parsed is None:
+                parsed = urlparse(url)
             hostname = parsed.hostname or ''
             path = parsed.path or ''
-            full_url = url.lower()
-        except Exception:
+        except ValueError:
+            # Malformed netloc (e.g. unbalanced IPv6 brackets)
             hostname = ''
             path = ''
-            full_url = url.lower()
 
-        # 1. URL Length
-        features['url_length'] = float(len(url))
+        url_length = len(url)
+        dot_count = hostname.count('.')
 
-        # 2. Hostname Length
-        features['hostname_length'] = float(len(hostname))
+        # Built as one dict literal (feature order matches get_feature_names())
+        return {
+            # 1. URL Length
+            'url_length': float(url_length),
 
-        # 3. Path Length
-        features['path_length'] = float(len(path))
+            # 2. Hostname Length
+            'hostname_length': float(len(hostname)),
 
-        # 4. HTTPS Usage
-        features['has_https'] = 1.0 if url.startswith('https://') else 0.0
+            # 3. Path Length
+            'path_length': float(len(path)),
 
-        # 5. Suspicious TLD
-        features['suspicious_tld'] = 1.0 if any(
-            hostname.endswith(tld) for tld in self.suspicious_tlds
-        ) else 0.0
+            # 4. HTTPS Usage
+            'has_https': 1.0 if url.startswith('https://') else 0.0,
 
-        # 6. IP Address in Hostname
-        ip_pattern = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
-        features['is_ip_address'] = 1.0 if ip_pattern.match(hostname) else 0.0
+            # 5. Suspicious TLD
+            'suspicious_tld': 1.0 if hostname.endswith(self.suspicious_tlds) else 0.0,
 
-        # 7. Dot Count in Hostname
-        features['dot_count'] = float(hostname.count('.'))
+            # 6. IP Address in Hostname
+            'is_ip_address': 1.0 if IP_PATTERN.fullmatch(hostname) else 0.0,
 
-        # 8. Hyphen Count in Hostname
-        features['hyphen_count'] = float(hostname.count('-'))
+            # 7. Dot Count in Hostname
+            'dot_count': float(dot_count),
 
-        # 9. Suspicious Keyword Count
-        features['suspicious_keyword_count'] = float(sum(
-            1 for keyword in self.suspicious_keywords
-            if keyword in full_url
-        ))
+            # 8. Hyphen Count in Hostname
+            'hyphen_count': float(hostname.count('-')),
 
-        # 10. Brand Mention Count (possible brand impersonation)
-        features['brand_mention_count'] = float(sum(
-            1 for brand in self.known_brands
-            if brand in full_url
-        ))
+            # 9. Suspicious Keyword Count
+            'suspicious_keyword_count': float(sum(
+                1 for keyword in self.suspicious_keywords
+                if keyword in full_url
+            )),
 
-        # 11. Subdomain Count
-        parts = hostname.split('.') if hostname else []
-        features['subdomain_count'] = float(max(0, len(parts) - 2))
+            # 10. Brand Mention Count (possible brand impersonation)
+            'brand_mention_count': float(sum(
+                1 for brand in self.known_brands
+                if brand in full_url
+            )),
 
-        # 12. Path Depth
-        features['path_depth'] = float(path.count('/'))
+            # 11. Subdomain Count
+            # A non-empty hostname has dot_count + 1 labels, so no split is needed
+            'subdomain_count': float(max(0, dot_count - 1)) if hostname else 0.0,
 
-        # 13. Has Query Parameters
-        features['has_query'] = 1.0 if '?' in url else 0.0
+            # 12. Path Depth
+            'path_depth': float(path.count('/')),
 
-        # 14. Has Fragment
-        features['has_fragment'] = 1.0 if '#' in url else 0.0
+            # 13. Has Query Parameters
+            'has_query': 1.0 if '?' in url else 0.0,
 
-        # 15. Character Diversity
-        if len(url) > 0:
-            features['char_diversity'] = len(set(url)) / len(url)
-        else:
-            features['char_diversity'] = 0.0
+            # 14. Has Fragment
+            'has_fragment': 1.0 if '#' in url else 0.0,
 
-        return features
+            # 15. Character Diversity
+            'char_diversity': len(set(url)) / url_length if url_length > 0 else 0.0,
+        }
 
     def get_feature_names(self) -> List[str]:
         """
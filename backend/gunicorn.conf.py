@@ -0,0 +1,36 @@
+"""
+Gunicorn Configuration
+Production WSGI server settings for the AtomGuard backend
+
+Run from the backend directory:
+    gunicorn -c gunicorn.conf.py app:app
+
+or from the repository root:
+    gunicorn -c backend/gunicorn.conf.py app:app
+
+NOTE:
+- The app (ML model + ONNX Runtime session) is loaded once in the master
+  process and shared with workers through fork (preload_app)
+- Each worker serves requests on a pool of threads (gthread)
+"""
+
+import os
+import multiprocessing
+
+# Import the app from the backend directory regardless of where gunicorn starts
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+# Bind address (same HOST / PORT variables as the development server)
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+
+# Worker processes (default: one per CPU core)
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Threaded workers so one slow request does not block the worker.
+# ONNX Runtime releases the GIL during inference, so other threads keep
+# running feature extraction and rules while a prediction is in flight.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Load the model once before forking workers
+preload_app = True
@@ -10,11 +10,33 @@ CRITICAL REQUIREMENTS:
 """
 
 import re
-from urllib.parse import urlparse
-from typing import List
+import numpy as np
+from urllib.parse import urlparse, ParseResult, SplitResult
+from typing import List, Optional, Union
 
+# Model was trained with exactly 7 features
+N_FEATURES = 7
 
-def extract_features(url: str) -> List[float]:
+# Feature names in training order (for debugging/logging only)
+FEATURE_NAMES = (
+    'url_length',
+    'hostname_length',
+    'path_length',
+    'has_https',
+    'suspicious_tld',
+    'is_ip_address',
+    'dot_count'
+)
+
+# Suspicious TLDs checked by feature 5 (tuple so str.endswith scans them in C)
+SUSPICIOUS_TLDS = ('.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.click')
+
+# Dotted-quad IPv4 hostname checked by feature 6 (compiled once at import,
+# used with fullmatch() so both ends are anchored)
+IP_PATTERN = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
+
+
+def extract_features(url: str, parsed: Optional[Union[SplitResult, ParseResult]] = None) -> List[float]:
     """
     Extract ML features from URL as a LIST of numeric values.
     
@@ -23,6 +45,8 @@ def extract_features(url: str) -> List[float]:
     
     Args:
         url: URL string to analyze
+        parsed: Optional parse_url() result for the same URL (with protocol),
+            reused instead of parsing the URL again
         
     Returns:
         List of float features in training order
@@ -35,80 +59,65 @@ def extract_features(url: str) -> List[float]:
     
     # Parse URL safely
     try:
-        parsed = urlparse(normalized_url)
-        hostname = parsed.hostname or ''
+        if parsed is None:
+            parsed = urlparse(normalized_url)
+        hostname = parsed.hostname or ''  # Already lowercased by urlparse
         path = parsed.path or ''
-        query = parsed.query or ''
-        fragment = parsed.fragment or ''
-    except Exception:
+    except ValueError:
+        # Malformed netloc (e.g. unbalanced IPv6 brackets)
         hostname = ''
         path = ''
-        query = ''
-        fragment = ''
-    
-    # Convert to lowercase for analysis
-    lower_url = normalized_url.lower()
-    lower_hostname = hostname.lower()
-    
-    # Initialize feature list (order must match training)
-    features: List[float] = []
-    
-    # ========== FEATURE 1: URL Length ==========
-    features.append(float(len(url)))
-    
-    # ========== FEATURE 2: Hostname Length ==========
-    features.append(float(len(hostname)))
     
-    # ========== FEATURE 3: Path Length ==========
-    features.append(float(len(path)))
-    
-    # ========== FEATURE 4: HTTPS Usage (1.0 = yes, 0.0 = no) ==========
-    features.append(1.0 if normalized_url.startswith('https://') else 0.0)
-    
-    # ========== FEATURE 5: Suspicious TLD (1.0 = yes, 0.0 = no) ==========
-    suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.click']
-    has_suspicious_tld = 1.0 if any(lower_hostname.endswith(tld) for tld in suspicious_tlds) else 0.0
-    features.append(has_suspicious_tld)
-    
-    # ========== FEATURE 6: IP Address Usage (1.0 = yes, 0.0 = no) ==========
-    ip_pattern = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
-    is_ip = 1.0 if ip_pattern.match(hostname) else 0.0
-    features.append(is_ip)
-    
-    # ========== FEATURE 7: Dot Count in Hostname ==========
-    features.append(float(hostname.count('.')))
-    
-    # CRITICAL: Model was trained with exactly 7 features
-    # Return only the first 7 features to match training data
-    # Features 8-20 are not used by the current model
-    
-    # Ensure all features are floats and handle edge cases
-    try:
-        feature_list = [float(f) for f in features]
+    # Build the feature list directly (order must match training).
+    # Every value is a finite float by construction, so no post-validation
+    # pass is needed.
+    return [
+        # ========== FEATURE 1: URL Length ==========
+        float(len(url)),
+        
+        # ========== FEATURE 2: Hostname Length ==========
+        float(len(hostname)),
         
-        # Validate feature count (model expects exactly 7)
-        expected_count = 7
-        if len(feature_list) < expected_count:
-            raise ValueError(
-                f"Feature extraction error: expected at least {expected_count} features, "
-                f"got {len(feature_list)}"
-            )
+        # ========== FEATURE 3: Path Length ==========
+        float(len(path)),
         
-        # Return only the first 7 features (matching model training)
-        feature_list = feature_list[:expected_count]
+        # ========== FEATURE 4: HTTPS Usage (1.0 = yes, 0.0 = no) ==========
+        1.0 if normalized_url.startswith('https://') else 0.0,
         
-        # Validate no NaN or Inf values
-        for i, val in enumerate(feature_list):
-            if not isinstance(val, (int, float)) or not (float('-inf') < val < float('inf')):
-                raise ValueError(f"Invalid feature value at index {i}: {val}")
+        # ========== FEATURE 5: Suspicious TLD (1.0 = yes, 0.0 = no) ==========
+        1.0 if hostname.endswith(SUSPICIOUS_TLDS) else 0.0,
         
-        return feature_list
+        # ========== FEATURE 6: IP Address Usage (1.0 = yes, 0.0 = no) ==========
+        1.0 if IP_PATTERN.fullmatch(hostname) else 0.0,
         
-    except Exception as e:
-        # Return safe default features if extraction fails
-        print(f"⚠️  Feature extraction error: {str(e)}")
-        # Return zero-filled feature vector of correct length (7 features)
-        return [0.0] * 7
+        # ========== FEATURE 7: Dot Count in Hostname ==========
+        float(hostname.count('.')),
+    ]
+
+
+def extract_features_array(
+    url: str,
+    out: Optional[np.ndarray] = None,
+    parsed: Optional[Union[SplitResult, ParseResult]] = None
+) -> np.ndarray:
+    """
+    Extract ML features from URL as a float32 array in training order.
+
+    This is the model input layout: one contiguous float32 row that can be
+    reshaped to (1, n_features) without further conversion.
+
+    Args:
+        url: URL string to analyze
+        out: Optional preallocated float32 array of length N_FEATURES
+        parsed: Optional parse_url() result for the same URL (with protocol)
+
+    Returns:
+        float32 array of features in training order
+    """
+    if out is None:
+        out = np.empty(N_FEATURES, dtype=np.float32)
+    out[:] = extract_features(url, parsed)
+    return out
 
 
 def get_feature_count() -> int:
@@ -116,8 +125,7 @@ def get_feature_count() -> int:
     Returns the number of features extracted.
     Useful for validation and debugging.
     """
-    # Model expects exactly 7 features
-    return 7
+    return N_FEATURES
 
 
 def get_feature_names() -> List[str]:
@@ -126,13 +134,5 @@ def get_feature_names() -> List[str]:
     This should match the training data feature order.
     Model was trained with exactly 7 features.
     """
-    return [
-        'url_length',
-        'hostname_length',
-        'path_length',
-        'has_https',
-        'suspicious_tld',
-        'is_ip_address',
-        'dot_count'
-    ]
+    return list(FEATURE_NAMES)
 
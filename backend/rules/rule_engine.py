@@ -8,10 +8,42 @@ IMPORTANT:
 - Rules are used only for explanations, evidence, and fallback
 """
 
-from typing import Dict
+from typing import Dict, Optional
 import re
 
 
+# Brand imitation patterns, compiled once at import time (checked in order).
+# They run on the lowercased URL, so they are case-sensitive: re.I would
+# fold per character, and on lowercase input it only adds the two
+# characters it also maps onto these letters, dotless i (ı) and long s (ſ),
+# which are spelled out instead.
+BRAND_PATTERNS = (
+    (re.compile(r"paypa[l1]|paypa[iı]"), "PayPal"),
+    (re.compile(r"amaz[o0]n|amazn"), "Amazon"),
+    (re.compile(r"g[o0]{2}gle|go0gle"), "Google"),
+    (re.compile(r"m[iı]cr[o0][sſ]oft|m[iı]cr[sſ]oft"), "Microsoft"),
+    (re.compile(r"app[1l]e|aple"), "Apple"),
+    (re.compile(r"faceb[o0]ok|facebok"), "Facebook"),
+    (re.compile(r"tw[iı1]tter|twtter"), "Twitter"),
+)
+
+# All brand patterns fused into one scan, used to skip the ordered
+# per-brand search for URLs that imitate no brand (the common case)
+BRAND_PREFILTER = re.compile("|".join(pattern.pattern for pattern, _ in BRAND_PATTERNS))
+
+# Evidence entries, one shared dict per (rule, outcome). analyze() appends
+# these instead of building new dicts for every URL; they must not be mutated.
+EVIDENCE_HTTPS_ENABLED = {"label": "Protocol Security", "status": "safe", "icon": "check"}
+EVIDENCE_HTTPS_MISSING = {"label": "Protocol Security", "status": "warning", "icon": "alert"}
+EVIDENCE_SUSPICIOUS_TLD = {"label": "Domain Extension", "status": "danger", "icon": "x"}
+EVIDENCE_IP_ADDRESS = {"label": "IP Address Usage", "status": "danger", "icon": "x"}
+EVIDENCE_BRAND_IMITATION = {"label": "Brand Imitation", "status": "danger", "icon": "x"}
+EVIDENCE_URL_TOO_LONG = {"label": "URL Structure", "status": "warning", "icon": "alert"}
+EVIDENCE_URL_LENGTH_NORMAL = {"label": "URL Structure", "status": "safe", "icon": "check"}
+EVIDENCE_SUSPICIOUS_KEYWORDS = {"label": "Content Indicators", "status": "warning", "icon": "alert"}
+EVIDENCE_NO_SUSPICIOUS_KEYWORDS = {"label": "Content Indicators", "status": "safe", "icon": "check"}
+
+
 class RuleEngine:
     """
     Rule-based analysis engine for phishing detection explanations
@@ -20,13 +52,21 @@ class RuleEngine:
     duplicate feature extraction.
     """
 
-    def analyze(self, url: str, features: Dict[str, float]) -> Dict:
+    __slots__ = ('brand_patterns',)
+
+    def __init__(self):
+        self.brand_patterns = BRAND_PATTERNS
+
+    def analyze(self, url: str, features: Dict[str, float], lower_url: Optional[str] = None) -> Dict:
         """
         Analyze URL using heuristic rules and generate explanations
 
         Args:
             url: URL string
-            features: Feature dictionary from FeatureExtractor
+            features: Feature dictionary from FeatureExtractor (every
+                feature is required; a missing one raises KeyError)
+            lower_url: Optional lowercased, stripped URL, reused instead of
+                lowercasing the URL again
 
         Returns:
             Dictionary with verdict, risk level, explanation, and evidence
@@ -40,33 +80,22 @@ class RuleEngine:
         identification_tips = []
         action_steps = []
 
-        lower_url = url.lower().strip()
+        if lower_url is None:
+            lower_url = url.lower().strip()
 
         # ---------------- RULE 1: HTTPS CHECK ----------------
-        if features.get("has_https", 0.0) == 1.0:
-            evidence.append({
-                "label": "Protocol Security",
-                "status": "safe",
-                "icon": "check"
-            })
+        if features["has_https"] == 1.0:
+            evidence.append(EVIDENCE_HTTPS_ENABLED)
             checked_items.append("HTTPS protocol is enabled (encryption present)")
         else:
-            evidence.append({
-                "label": "Protocol Security",
-                "status": "warning",
-                "icon": "alert"
-            })
+            evidence.append(EVIDENCE_HTTPS_MISSING)
             checked_items.append("HTTPS protocol is missing (connection is not encrypted)")
             verdict = "SUSPICIOUS"
             risk_level = "Medium"
 
         # ---------------- RULE 2: SUSPICIOUS TLD ----------------
-        if features.get("suspicious_tld", 0.0) == 1.0:
-            evidence.append({
-                "label": "Domain Extension",
-                "status": "danger",
-                "icon": "x"
-            })
+        if features["suspicious_tld"] == 1.0:
+            evidence.append(EVIDENCE_SUSPICIOUS_TLD)
             checked_items.append(
                 "Free or uncommon domain extension often associated with phishing"
             )
@@ -74,12 +103,8 @@ class RuleEngine:
             risk_level = "High"
 
         # ---------------- RULE 3: IP ADDRESS USAGE ----------------
-        if features.get("is_ip_address", 0.0) == 1.0:
-            evidence.append({
-                "label": "IP Address Usage",
-                "status": "danger",
-                "icon": "x"
-            })
+        if features["is_ip_address"] == 1.0:
+            evidence.append(EVIDENCE_IP_ADDRESS)
             checked_items.append(
                 "URL uses an IP address instead of a domain name"
             )
@@ -90,23 +115,12 @@ class RuleEngine:
             )
 
         # ---------------- RULE 4: BRAND IMITATION ----------------
-        brand_patterns = [
-            (re.compile(r"paypa[l1]|paypai", re.I), "PayPal"),
-            (re.compile(r"amaz[o0]n|amazn", re.I), "Amazon"),
-            (re.compile(r"g[o0]{2}gle|go0gle", re.I), "Google"),
-            (re.compile(r"micr[o0]soft|micrsoft", re.I), "Microsoft"),
-            (re.compile(r"app[1l]e|aple", re.I), "Apple"),
-            (re.compile(r"faceb[o0]ok|facebok", re.I), "Facebook"),
-            (re.compile(r"tw[i1]tter|twtter", re.I), "Twitter"),
-        ]
-
+        # The prefilter only says whether some brand matches; the ordered
+        # patterns decide which one is reported
+        brand_patterns = self.brand_patterns if BRAND_PREFILTER.search(lower_url) else ()
         for pattern, brand in brand_patterns:
             if pattern.search(lower_url):
-                evidence.append({
-                    "label": "Brand Imitation",
-                    "status": "danger",
-                    "icon": "x"
-                })
+                evidence.append(EVIDENCE_BRAND_IMITATION)
                 checked_items.append(
                     f"Possible brand impersonation detected (resembles {brand})"
                 )
@@ -118,13 +132,9 @@ class RuleEngine:
                 break
 
         # ---------------- RULE 5: URL LENGTH ----------------
-        url_length = features.get("url_length", 0)
+        url_length = features["url_length"]
         if url_length > 75:
-            evidence.append({
-                "label": "URL Structure",
-                "status": "warning",
-                "icon": "alert"
-            })
+            evidence.append(EVIDENCE_URL_TOO_LONG)
             checked_items.append(
                 f"URL is unusually long ({url_length} characters)"
             )
@@ -132,23 +142,15 @@ class RuleEngine:
                 verdict = "SUSPICIOUS"
                 risk_level = "Medium"
         else:
-            evidence.append({
-                "label": "URL Structure",
-                "status": "safe",
-                "icon": "check"
-            })
+            evidence.append(EVIDENCE_URL_LENGTH_NORMAL)
             checked_items.append(
                 f"URL length is within normal range ({url_length} characters)"
             )
 
         # ---------------- RULE 6: SUSPICIOUS KEYWORDS ----------------
-        keyword_count = features.get("suspicious_keyword_count", 0)
+        keyword_count = features["suspicious_keyword_count"]
         if keyword_count > 0:
-            evidence.append({
-                "label": "Content Indicators",
-                "status": "warning",
-                "icon": "alert"
-            })
+            evidence.append(EVIDENCE_SUSPICIOUS_KEYWORDS)
             checked_items.append(
                 "Suspicious keywords related to authentication or payment detected"
             )
@@ -156,11 +158,7 @@ class RuleEngine:
                 verdict = "SUSPICIOUS"
                 risk_level = "Medium"
         else:
-            evidence.append({
-                "label": "Content Indicators",
-                "status": "safe",
-                "icon": "check"
-            })
+            evidence.append(EVIDENCE_NO_SUSPICIOUS_KEYWORDS)
             checked_items.append(
                 "No suspicious keywords detected in the URL"
             )
@@ -3,7 +3,7 @@ Utils Package
 Contains utility functions for URL validation and processing
 """
 
-from .helpers import validate_url, normalize_url, extract_domain
+from .helpers import validate_url, normalize_url, parse_url, extract_domain
 
-__all__ = ['validate_url', 'normalize_url', 'extract_domain']
+__all__ = ['validate_url', 'normalize_url', 'parse_url', 'extract_domain']
 
@@ -9,8 +9,13 @@ IMPORTANT DESIGN NOTE:
 - ML + Rule Engine must analyze them instead of rejecting early
 """
 
-from urllib.parse import urlparse
-from typing import Optional
+import functools
+from urllib.parse import urlparse, urlsplit, ParseResult, SplitResult
+from typing import Optional, Union
+
+# Longest URL validate_url() accepts. Only input within this limit is parsed
+# through the parse_url() cache, so oversized strings never become cache keys.
+MAX_URL_LENGTH = 2000
 
 
 def validate_url(url: str) -> bool:
@@ -41,34 +46,29 @@ def validate_url(url: str) -> bool:
         return False
 
     # Allow very long URLs (phishing technique)
-    if len(url) > 2000:  # Reasonable upper limit
+    if len(url) > MAX_URL_LENGTH:  # Reasonable upper limit
         return False
 
-    try:
-        # Add scheme only for parsing (do NOT modify original URL)
-        test_url = url
-        if not test_url.startswith(("http://", "https://")):
-            test_url = "http://" + test_url
-
-        parsed = urlparse(test_url)
-
-        # Minimal requirements
-        if parsed.scheme not in ("http", "https"):
-            return False
+    # Parse with a protocol added (the original URL is not modified).
+    # The parse is cached, so the analysis pipeline reuses it.
+    parsed = parse_url(url)
 
-        # Must have netloc (domain or IP)
-        # This is intentionally loose - allows @, IPs, etc.
-        if not parsed.netloc:
-            return False
+    # If parsing fails completely, reject
+    if parsed is None:
+        return False
 
-        # Allow empty netloc only if it's a data URL or similar (rare case)
-        # For our purposes, we require netloc
-        return True
+    # No scheme check needed: parse_url() only parses URLs that start
+    # with http:// or https://, so the scheme is always one of them
 
-    except Exception:
-        # If parsing fails completely, reject
+    # Must have netloc (domain or IP)
+    # This is intentionally loose - allows @, IPs, etc.
+    if not parsed.netloc:
         return False
 
+    # Allow empty netloc only if it's a data URL or similar (rare case)
+    # For our purposes, we require netloc
+    return True
+
 
 def normalize_url(url: str) -> str:
     """
@@ -93,6 +93,44 @@ def normalize_url(url: str) -> str:
     return url
 
 
+@functools.lru_cache(maxsize=4096)
+def parse_url(url: str) -> Optional[Union[SplitResult, ParseResult]]:
+    """
+    Parse a URL once so it can be shared by validate_url(), the feature
+    extractors and the post-ML hardening layers.
+
+    A missing protocol is filled in with https:// (netloc, hostname and
+    path are the same for http:// and https://). Results are cached per
+    URL; both result types are immutable, so sharing them is safe.
+
+    This is the only per-URL cache in the helpers. Callers pass URLs of at
+    most MAX_URL_LENGTH characters (validate_url() checks first), so the
+    cache holds at most 4096 bounded entries.
+
+    urlsplit() is used unless the URL contains ';': urlparse() moves
+    ;params off the last path segment, which changes path (and the
+    features built from it), so those URLs keep the urlparse() result.
+
+    Args:
+        url: Stripped URL string
+
+    Returns:
+        urlsplit() / urlparse() result, or None if parsing fails
+    """
+    try:
+        if not url.startswith(("http://", "https://")):
+            url = "https://" + url
+
+        if ";" in url:
+            return urlparse(url)
+
+        return urlsplit(url)
+
+    except ValueError:
+        # Malformed netloc (e.g. unbalanced IPv6 brackets)
+        return None
+
+
 def extract_domain(url: str) -> Optional[str]:
     """
     Extract domain / hostname from URL.
@@ -103,12 +141,16 @@ def extract_domain(url: str) -> Optional[str]:
     Returns:
         Hostname or None if extraction fails
     """
-    try:
-        if not url.startswith(("http://", "https://")):
-            url = "http://" + url
-
-        parsed = urlparse(url)
-        return parsed.hostname
+    if not isinstance(url, str):
+        return None
 
-    except Exception:
+    # Same hostname as parsing with http://. Input within the validation
+    # limit shares the parse_url() cache; longer input is parsed uncached.
+    if len(url) <= MAX_URL_LENGTH:
+        parsed = parse_url(url)
+    else:
+        parsed = parse_url.__wrapped__(url)
+    if parsed is None:
         return None
+
+    return parsed.hostname